@@ -5,24 +5,449 @@ Tests alert routing logic, severity-based routing, team assignments, and inhibit
 """
 
 import unittest
-import json
-import yaml
-import requests
-from unittest.mock import Mock, patch, MagicMock
+import logging
+import os
+import sys
+import types
 import time
+from collections import defaultdict, namedtuple
 from datetime import datetime, timedelta
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+if os.environ.get("APM_TEST_VERBOSE"):
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+
+try:
+    import pandas as pd
+    _HAS_PANDAS = True
+except ImportError:
+    _HAS_PANDAS = False
+
+try:
+    import numpy as np
+    from numba import njit
+    _HAS_NUMBA = True
+except ImportError:
+    _HAS_NUMBA = False
+
+# Batches larger than this are grouped with pandas when it is available
+_VECTORIZE_THRESHOLD = 256
+
+
+# Well-known label names, interned so label dict lookups and comparisons
+# against them can short-circuit on identity
+_ALERTNAME = sys.intern("alertname")
+_SEVERITY = sys.intern("severity")
+_TEAM = sys.intern("team")
+_SERVICE = sys.intern("service")
+_INSTANCE = sys.intern("instance")
+_JOB = sys.intern("job")
+
+# Order in which match criteria are compared, so a mismatching route is
+# rejected on its most selective label; labels not listed are compared last
+_SELECTIVITY = {_SEVERITY: 1, _TEAM: 2, _SERVICE: 3}
+
+
+def _ordered_match_items(match_dict):
+    """Return match criteria ordered by label selectivity."""
+    return sorted(match_dict.items(), key=lambda item: _SELECTIVITY.get(item[0], 100))
+
+
+def _compile_matcher(match_dict):
+    """Generate a straight-line predicate for a route's match criteria.
+
+    The returned function takes a label dict and compares each criterion
+    in turn, e.g. ``labels.get('severity') == 'critical' and ...``.
+    """
+    namespace = {}
+    conditions = []
+    for i, (key, value) in enumerate(match_dict.items()):
+        if isinstance(key, str) and isinstance(value, str):
+            conditions.append(f"labels.get({key!r}) == {value!r}")
+        else:
+            namespace[f"_k{i}"], namespace[f"_v{i}"] = key, value
+            conditions.append(f"labels.get(_k{i}) == _v{i}")
+    body = " and ".join(conditions) or "True"
+    exec(f"def matcher(labels):\n    return {body}\n", namespace)
+    return namespace["matcher"]
+
+
+def _route_matcher(route, matchers):
+    """Return the route's compiled matcher from a cache keyed by its criteria."""
+    match_items = tuple(_ordered_match_items(route.get("match", {})))
+    matcher = matchers.get(match_items)
+    if matcher is None:
+        matcher = matchers[match_items] = _compile_matcher(dict(match_items))
+    return matcher
+
+
+def _index_routes_by(routes, label):
+    """Index routes by the value their match criteria require for a label.
+
+    The first route wins when several require the same value.
+    """
+    index = {}
+    for route in routes:
+        index.setdefault(route.get("match", {}).get(label), route)
+    return index
+
+
+# A routing tree compiled into per-level lookup tables keyed by
+# (label_name, label_value), so dispatch costs one dict probe per level
+# instead of a scan over every sibling route.
+CompiledNode = namedtuple("CompiledNode", "receiver children match_keys route catch_all")
+
+
+def _compile_routing_tree(tree):
+    """Compile a routing tree into nested label lookup tables.
+
+    Sibling positions are kept so first-match precedence is unchanged.
+    """
+    children = {}
+    catch_all = []
+    for position, route in enumerate(tree.get("routes", [])):
+        node = _compile_routing_tree(route)
+        match_items = _ordered_match_items(route.get("match", {}))
+        if not match_items:
+            catch_all.append((position, None, node))
+            continue
+        (key, value), rest = match_items[0], match_items[1:]
+        matcher = _compile_matcher(dict(rest)) if rest else None
+        children.setdefault(key, {}).setdefault(value, []).append((position, matcher, node))
+    return CompiledNode(tree.get("receiver"), children, tuple(children), tree, tuple(catch_all))
+
+
+def _match(node, labels):
+    """Return the first child of a compiled node matching the labels."""
+    # Probe each indexed label once and keep the earliest sibling
+    # whose remaining match criteria also hold
+    best = None
+    for key in node.match_keys:
+        for position, matcher, child in node.children[key].get(labels.get(key), ()):
+            if best is not None and position > best[0]:
+                break
+            if matcher is None or matcher(labels):
+                best = (position, child)
+                break
+    if node.catch_all and (best is None or node.catch_all[0][0] < best[0]):
+        return node.catch_all[0][2]
+    return best[1] if best else None
+
+
+def _traverse(tree, labels):
+    """Walk a compiled routing tree and return the deepest matching route.
+
+    Returns None when no top-level route matches.
+    """
+    node = _match(tree, labels)
+    if node is None:
+        return None
+    while True:
+        child = _match(node, labels)
+        if child is None:
+            return node.route
+        node = child
+
+
+class Alert:
+    """Lightweight test alert.
+
+    Item access (``alert["labels"]``) is kept for code written against the
+    Alertmanager JSON shape.
+    """
+
+    __slots__ = ("labels", "annotations", "startsAt", "generatorURL", "_fp")
+
+    def __init__(self):
+        self._fp = None
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
+# With Numba available, label sets are also int-encoded: each distinct
+# (label_name, label_value) pair gets a code and the well-known labels are
+# packed into fixed positions of an int32 vector (-1 for a missing label).
+_VEC_LABELS = (_ALERTNAME, _SEVERITY, _TEAM, _SERVICE, _INSTANCE, _JOB)
+_VEC_POSITION = {name: i for i, name in enumerate(_VEC_LABELS)}
+
+
+if _HAS_NUMBA:
+    @njit(boundscheck=False)
+    def _inhibited(src_vec, tgt_vec, src_match, tgt_match, equal_idx):
+        """Inhibition check over int-encoded label vectors."""
+        for i in range(src_match.shape[0]):
+            if src_vec[src_match[i, 0]] != src_match[i, 1]:
+                return False
+        for i in range(tgt_match.shape[0]):
+            if tgt_vec[tgt_match[i, 0]] != tgt_match[i, 1]:
+                return False
+        for i in range(equal_idx.shape[0]):
+            if src_vec[equal_idx[i]] != tgt_vec[equal_idx[i]]:
+                return False
+        return True
+
+
+# An inhibition rule's match criteria and equal labels as tuples, built
+# alongside the rule dict so shared fixtures are never modified
+PreparedRule = namedtuple("PreparedRule", "src_items tgt_items equal")
+
+
+def _prepare_inhibition_rule(rule):
+    """Return a rule's match criteria and equal labels as tuples."""
+    return PreparedRule(tuple(rule["source_match"].items()),
+                        tuple(rule["target_match"].items()),
+                        tuple(rule.get("equal", [])))
+
+
+def _equal_key(labels, equal_fields):
+    """Return the values of the equal labels as a hashable key."""
+    return tuple(labels.get(field) for field in equal_fields)
+
+
+class InhibitionMemo:
+    """Memo tables for inhibition checks, owned by a test class.
+
+    Label sets are registered by fingerprint and rules by an index derived
+    from their contents, so checks are memoized on hashable
+    (source_fp, target_fp, rule_idx) triples.
+    """
+
+    def __init__(self, use_numba=_HAS_NUMBA):
+        self.use_numba = use_numba
+        self.fp_to_labels = {}
+        self.rules_by_idx = []
+        self.rule_idx_by_key = {}
+        self.label_codes = {}
+        self.fp_to_vec = {}
+        self.encoded_rules = {}
+        self.results = {}
+
+    def clear(self):
+        """Drop every registered label set, rule and memoized result."""
+        for table in (self.fp_to_labels, self.rule_idx_by_key, self.label_codes,
+                      self.fp_to_vec, self.encoded_rules, self.results):
+            table.clear()
+        self.rules_by_idx.clear()
+
+    def label_code(self, name, value):
+        """Return the int code for a (label_name, label_value) pair."""
+        return self.label_codes.setdefault((name, value), len(self.label_codes))
+
+    def encode_labels(self, labels):
+        """Pack the well-known labels of a label set into an int32 vector."""
+        return np.array([self.label_code(name, labels[name]) if name in labels else -1
+                         for name in _VEC_LABELS], dtype=np.int32)
+
+    def encode_match(self, match_items):
+        """Encode match criteria as an (n, 2) array of (position, code) pairs."""
+        pairs = [(_VEC_POSITION[name], self.label_code(name, value)) for name, value in match_items]
+        return np.array(pairs, dtype=np.int32).reshape(len(pairs), 2)
+
+    def encode_rule(self, rule_idx):
+        """Int-encode an inhibition rule, or None if it uses other labels."""
+        if rule_idx in self.encoded_rules:
+            return self.encoded_rules[rule_idx]
+        
+        rule = self.rules_by_idx[rule_idx]
+        names = [*(name for name, _ in rule.src_items),
+                 *(name for name, _ in rule.tgt_items), *rule.equal]
+        encoded = None
+        if all(name in _VEC_POSITION for name in names):
+            encoded = (
+                self.encode_match(rule.src_items),
+                self.encode_match(rule.tgt_items),
+                np.array([_VEC_POSITION[name] for name in rule.equal], dtype=np.int32),
+            )
+        self.encoded_rules[rule_idx] = encoded
+        return encoded
+
+    def register_labels(self, labels):
+        """Fingerprint a label set and remember it for memoized lookups."""
+        fp = hash(frozenset(labels.items()))
+        self.fp_to_labels[fp] = dict(labels)
+        if self.use_numba:
+            self.fp_to_vec[fp] = self.encode_labels(labels)
+        return fp
+
+    def alert_fp(self, alert):
+        """Return the alert fingerprint, computing it on first use."""
+        fp = alert._fp
+        if fp is None:
+            fp = alert._fp = self.register_labels(alert.labels)
+        return fp
+
+    def rule_index(self, rule):
+        """Return a stable index for an inhibition rule, keyed by its contents."""
+        key = _prepare_inhibition_rule(rule)
+        idx = self.rule_idx_by_key.get(key)
+        if idx is None:
+            idx = self.rule_idx_by_key[key] = len(self.rules_by_idx)
+            self.rules_by_idx.append(key)
+        return idx
+
+    def check(self, src_fp, tgt_fp, rule_idx):
+        """Memoized inhibition check for a (source, target, rule) triple."""
+        key = (src_fp, tgt_fp, rule_idx)
+        result = self.results.get(key)
+        if result is None:
+            result = self.results[key] = self._check(src_fp, tgt_fp, rule_idx)
+        return result
+
+    def _check(self, src_fp, tgt_fp, rule_idx):
+        """Uncached inhibition check."""
+        if self.use_numba:
+            encoded = self.encode_rule(rule_idx)
+            if encoded is not None:
+                return bool(_inhibited(self.fp_to_vec[src_fp], self.fp_to_vec[tgt_fp], *encoded))
+        
+        source_labels = self.fp_to_labels[src_fp]
+        target_labels = self.fp_to_labels[tgt_fp]
+        inhibition_rule = self.rules_by_idx[rule_idx]
+        
+        # Check source match
+        for key, value in inhibition_rule.src_items:
+            if source_labels.get(key) != value:
+                return False
+        
+        # Check target match
+        for key, value in inhibition_rule.tgt_items:
+            if target_labels.get(key) != value:
+                return False
+        
+        # Check equal fields
+        equal_fields = inhibition_rule.equal
+        return _equal_key(source_labels, equal_fields) == _equal_key(target_labels, equal_fields)
+
+
+def _build_equals_index(sources, rule, memo):
+    """Index source alerts by the values of the rule's equal labels.
+
+    Only sources satisfying source_match enter the index, so a target is
+    inhibited when its own equal-label key is present.
+    """
+    rule = _prepare_inhibition_rule(rule)
+    source_match = rule.src_items
+    equal_fields = rule.equal
+    index = {}
+    for source in sources:
+        labels = source.labels
+        if all(labels.get(key) == value for key, value in source_match):
+            index.setdefault(_equal_key(labels, equal_fields), []).append(memo.alert_fp(source))
+    return index
+
 
 class AlertRoutingTest(unittest.TestCase):
     """Test suite for alert routing functionality."""
 
-    def setUp(self):
-        """Set up test environment."""
-        self.alertmanager_url = "http://localhost:9093"
-        self.test_alerts = []
+    @classmethod
+    def setUpClass(cls):
+        """Set up sample alerts and routing configurations shared by all tests."""
+        cls._ROUTING_RULES = {
+            "route": {
+                "receiver": "default",
+                "group_by": ["alertname", "severity"],
+                "group_wait": "10s",
+                "group_interval": "10s",
+                "repeat_interval": "1h",
+                "routes": [
+                    {
+                        "match": {"severity": "critical"},
+                        "receiver": "critical-alerts",
+                        "group_wait": "5s",
+                        "repeat_interval": "5m"
+                    },
+                    {
+                        "match": {"team": "platform"},
+                        "receiver": "platform-team",
+                        "group_interval": "30s"
+                    }
+                ]
+            }
+        }
+        
+        cls._SEVERITY_ROUTING = {
+            "critical": {
+                "receiver": "critical-alerts",
+                "group_wait": "5s",
+                "repeat_interval": "5m"
+            },
+            "warning": {
+                "receiver": "warning-alerts",
+                "group_wait": "30s",
+                "repeat_interval": "30m"
+            },
+            "info": {
+                "receiver": "info-alerts",
+                "group_wait": "5m",
+                "repeat_interval": "4h"
+            }
+        }
+        
+        cls._TEAM_ROUTES = {
+            "platform": "platform-team-slack",
+            "data": "data-team-email",
+            "infrastructure": "infra-team-pagerduty",
+            "security": "security-team-emergency"
+        }
+        
+        cls._INHIBITION_RULES = [
+            {
+                "source_match": {"alertname": "NodeDown"},
+                "target_match": {"severity": "warning"},
+                "target_match_re": {"instance": ".*"},
+                "equal": ["instance"]
+            },
+            {
+                "source_match": {"severity": "critical"},
+                "target_match": {"severity": "warning"},
+                "equal": ["service"]
+            }
+        ]
+        # Inhibition memo tables live as long as this test class
+        cls._inhibition = InhibitionMemo()
+        
+        cls._ROUTING_TREE = {
+            "receiver": "default",
+            "routes": [
+                {
+                    "match": {"severity": "critical"},
+                    "receiver": "critical-alerts",
+                    "routes": [
+                        {
+                            "match": {"team": "platform"},
+                            "receiver": "platform-critical"
+                        }
+                    ]
+                },
+                {
+                    "match": {"team": "data"},
+                    "receiver": "data-team"
+                }
+            ]
+        }
+        
+        cls._ROUTING_CONFIG = {
+            "receiver": "default",
+            "routes": [
+                {
+                    "match": {"severity": "critical"},
+                    "receiver": "critical-alerts",
+                    "continue": True
+                },
+                {
+                    "match": {"team": "platform"},
+                    "receiver": "platform-team"
+                }
+            ]
+        }
         
         # Sample alert configurations
-        self.sample_alerts = {
+        cls.sample_alerts = types.MappingProxyType({
             "critical_cpu": {
                 "alertname": "HighCPUUsage",
                 "severity": "critical",
@@ -47,7 +472,21 @@ class AlertRoutingTest(unittest.TestCase):
                 "instance": "storage-01",
                 "value": "70"
             }
-        }
+        })
+
+    @classmethod
+    def tearDownClass(cls):
+        """Drop the inhibition memo tables built for this class."""
+        cls._inhibition.clear()
+
+    def setUp(self):
+        """Set up test environment."""
+        self.alertmanager_url = "http://localhost:9093"
+        self.test_alerts = []
+        self._compiled_trees = {}
+        self._route_cache = {}
+        self._route_matchers = {}
+        self._now_iso = datetime.utcnow().isoformat() + "Z"
 
     def tearDown(self):
         """Clean up test alerts."""
@@ -60,73 +499,31 @@ class AlertRoutingTest(unittest.TestCase):
             for alert in self.test_alerts:
                 self.silence_alert(alert)
         except Exception as e:
-            print(f"Cleanup warning: {e}")
+            logger.warning("Cleanup warning: %s", e)
 
     def test_alert_routing_validation(self):
         """Test basic alert routing validation."""
-        print("Testing alert routing validation...")
-        
-        # Test routing rules structure
-        routing_rules = {
-            "route": {
-                "receiver": "default",
-                "group_by": ["alertname", "severity"],
-                "group_wait": "10s",
-                "group_interval": "10s",
-                "repeat_interval": "1h",
-                "routes": [
-                    {
-                        "match": {"severity": "critical"},
-                        "receiver": "critical-alerts",
-                        "group_wait": "5s",
-                        "repeat_interval": "5m"
-                    },
-                    {
-                        "match": {"team": "platform"},
-                        "receiver": "platform-team",
-                        "group_interval": "30s"
-                    }
-                ]
-            }
-        }
+        logger.debug("Testing alert routing validation...")
         
         # Validate routing structure
-        self.assertIn("route", routing_rules)
-        self.assertIn("receiver", routing_rules["route"])
-        self.assertIn("routes", routing_rules["route"])
+        self.assertIn("route", self._ROUTING_RULES)
+        self.assertIn("receiver", self._ROUTING_RULES["route"])
+        self.assertIn("routes", self._ROUTING_RULES["route"])
         
         # Test route matching logic
-        critical_route = next(r for r in routing_rules["route"]["routes"] 
-                            if r["match"].get("severity") == "critical")
+        routes_by_severity = _index_routes_by(self._ROUTING_RULES["route"]["routes"], "severity")
+        critical_route = routes_by_severity["critical"]
         self.assertEqual(critical_route["receiver"], "critical-alerts")
         self.assertEqual(critical_route["group_wait"], "5s")
         
-        print("✓ Alert routing validation passed")
+        logger.debug("✓ Alert routing validation passed")
 
     def test_severity_based_routing(self):
         """Test routing based on alert severity levels."""
-        print("Testing severity-based routing...")
-        
-        severity_routing = {
-            "critical": {
-                "receiver": "critical-alerts",
-                "group_wait": "5s",
-                "repeat_interval": "5m"
-            },
-            "warning": {
-                "receiver": "warning-alerts",
-                "group_wait": "30s",
-                "repeat_interval": "30m"
-            },
-            "info": {
-                "receiver": "info-alerts",
-                "group_wait": "5m",
-                "repeat_interval": "4h"
-            }
-        }
+        logger.debug("Testing severity-based routing...")
         
         # Test each severity level
-        for severity, config in severity_routing.items():
+        for severity, config in self._SEVERITY_ROUTING.items():
             alert = self.create_test_alert(severity)
             expected_receiver = config["receiver"]
             
@@ -142,20 +539,13 @@ class AlertRoutingTest(unittest.TestCase):
             else:
                 self.assertEqual(matched_route["group_wait"], "5m")
         
-        print("✓ Severity-based routing tests passed")
+        logger.debug("✓ Severity-based routing tests passed")
 
     def test_team_assignment_verification(self):
         """Test team-based alert routing."""
-        print("Testing team assignment verification...")
-        
-        team_routes = {
-            "platform": "platform-team-slack",
-            "data": "data-team-email",
-            "infrastructure": "infra-team-pagerduty",
-            "security": "security-team-emergency"
-        }
+        logger.debug("Testing team assignment verification...")
         
-        for team, expected_receiver in team_routes.items():
+        for team, expected_receiver in self._TEAM_ROUTES.items():
             alert = self.create_test_alert("warning", team=team)
             
             # Test team-based routing
@@ -163,97 +553,140 @@ class AlertRoutingTest(unittest.TestCase):
             self.assertEqual(matched_route["receiver"], expected_receiver)
             
             # Verify team label is preserved
-            self.assertEqual(alert["labels"]["team"], team)
+            self.assertEqual(alert.labels["team"], team)
         
-        print("✓ Team assignment verification passed")
+        logger.debug("✓ Team assignment verification passed")
 
     def test_inhibition_rule_testing(self):
         """Test alert inhibition rules."""
-        print("Testing inhibition rules...")
-        
-        inhibition_rules = [
-            {
-                "source_match": {"alertname": "NodeDown"},
-                "target_match": {"severity": "warning"},
-                "target_match_re": {"instance": ".*"},
-                "equal": ["instance"]
-            },
-            {
-                "source_match": {"severity": "critical"},
-                "target_match": {"severity": "warning"},
-                "equal": ["service"]
-            }
-        ]
+        logger.debug("Testing inhibition rules...")
         
         # Test NodeDown inhibition
         node_down_alert = self.create_test_alert("critical", alertname="NodeDown")
         warning_alert = self.create_test_alert("warning", alertname="HighCPUUsage")
         
         # Same instance should be inhibited
-        node_down_alert["labels"]["instance"] = "web-01"
-        warning_alert["labels"]["instance"] = "web-01"
+        self.relabel_alert(node_down_alert, instance="web-01")
+        self.relabel_alert(warning_alert, instance="web-01")
         
-        inhibited = self.check_inhibition(node_down_alert, warning_alert, inhibition_rules[0])
+        inhibited = self.check_inhibition(node_down_alert, warning_alert, self._INHIBITION_RULES[0])
         self.assertTrue(inhibited, "Warning alert should be inhibited by NodeDown")
         
         # Different instance should not be inhibited
-        warning_alert["labels"]["instance"] = "web-02"
-        inhibited = self.check_inhibition(node_down_alert, warning_alert, inhibition_rules[0])
+        self.relabel_alert(warning_alert, instance="web-02")
+        inhibited = self.check_inhibition(node_down_alert, warning_alert, self._INHIBITION_RULES[0])
         self.assertFalse(inhibited, "Warning alert on different instance should not be inhibited")
         
         # Test severity-based inhibition
         critical_alert = self.create_test_alert("critical", service="web-server")
         warning_alert = self.create_test_alert("warning", service="web-server")
         
-        inhibited = self.check_inhibition(critical_alert, warning_alert, inhibition_rules[1])
+        inhibited = self.check_inhibition(critical_alert, warning_alert, self._INHIBITION_RULES[1])
         self.assertTrue(inhibited, "Warning alert should be inhibited by critical alert for same service")
         
-        print("✓ Inhibition rule testing passed")
+        logger.debug("✓ Inhibition rule testing passed")
 
-    def test_routing_tree_traversal(self):
-        """Test routing tree traversal logic."""
-        print("Testing routing tree traversal...")
+    def test_inhibition_equals_index(self):
+        """Test inhibition across many source and target alerts."""
+        logger.debug("Testing inhibition equals index...")
+        
+        inhibition_rule = {
+            "source_match": {"alertname": "NodeDown"},
+            "target_match": {"severity": "warning"},
+            "equal": ["instance"]
+        }
         
-        routing_tree = {
-            "receiver": "default",
-            "routes": [
-                {
-                    "match": {"severity": "critical"},
-                    "receiver": "critical-alerts",
-                    "routes": [
-                        {
-                            "match": {"team": "platform"},
-                            "receiver": "platform-critical"
-                        }
-                    ]
-                },
-                {
-                    "match": {"team": "data"},
-                    "receiver": "data-team"
-                }
+        sources = []
+        for instance in ["web-01", "web-02"]:
+            alert = self.create_test_alert("critical", alertname="NodeDown")
+            self.relabel_alert(alert, instance=instance)
+            sources.append(alert)
+        
+        # Critical alert on web-03 does not satisfy source_match
+        other_source = self.create_test_alert("critical", alertname="HighCPUUsage")
+        self.relabel_alert(other_source, instance="web-03")
+        sources.append(other_source)
+        
+        targets = []
+        for instance in ["web-01", "web-02", "web-03"]:
+            alert = self.create_test_alert("warning", alertname="HighMemoryUsage")
+            self.relabel_alert(alert, instance=instance)
+            targets.append(alert)
+        
+        inhibited = self.find_inhibited_alerts(sources, targets, inhibition_rule)
+        self.assertEqual([a.labels["instance"] for a in inhibited], ["web-01", "web-02"])
+        
+        # Agrees with the pairwise check
+        for target in targets:
+            expected = any(self.check_inhibition(source, target, inhibition_rule)
+                           for source in sources)
+            self.assertEqual(target in inhibited, expected)
+        
+        logger.debug("✓ Inhibition equals index tests passed")
+
+    @unittest.skipUnless(_HAS_NUMBA, "numba is not installed")
+    def test_inhibition_paths_agree(self):
+        """Test that the Numba and pure-Python inhibition checks agree."""
+        logger.debug("Testing inhibition check paths...")
+
+        alerts = []
+        for alertname in ["NodeDown", "HighCPUUsage"]:
+            for severity in ["critical", "warning"]:
+                for service in ["web-server", "database"]:
+                    for instance in ["web-01", "web-02"]:
+                        alert = self.create_test_alert(severity, alertname=alertname, service=service)
+                        self.relabel_alert(alert, instance=instance)
+                        alerts.append(alert)
+
+        # The last rule matches on a label outside the encoded vector, so the
+        # Numba memo falls back to the dict comparison for it
+        rules = [*self._INHIBITION_RULES, {
+            "source_match": {"alertname": "NodeDown"},
+            "target_match": {"severity": "warning"},
+            "equal": ["instance", "value"]
+        }]
+
+        results = {}
+        for use_numba in (True, False):
+            memo = InhibitionMemo(use_numba=use_numba)
+            fps = [memo.register_labels(alert.labels) for alert in alerts]
+            results[use_numba] = [
+                memo.check(src_fp, tgt_fp, memo.rule_index(rule))
+                for rule in rules
+                for src_fp in fps
+                for tgt_fp in fps
             ]
-        }
+
+        self.assertEqual(results[True], results[False])
+        self.assertIn(True, results[False])
+        self.assertIn(False, results[False])
+
+        logger.debug("✓ Inhibition check path tests passed")
+
+    def test_routing_tree_traversal(self):
+        """Test routing tree traversal logic."""
+        logger.debug("Testing routing tree traversal...")
         
         # Test nested routing
         critical_platform_alert = self.create_test_alert("critical", team="platform")
-        route = self.traverse_routing_tree(critical_platform_alert, routing_tree)
+        route = self.traverse_routing_tree(critical_platform_alert, self._ROUTING_TREE)
         self.assertEqual(route["receiver"], "platform-critical")
         
         # Test first-level matching
         data_alert = self.create_test_alert("warning", team="data")
-        route = self.traverse_routing_tree(data_alert, routing_tree)
+        route = self.traverse_routing_tree(data_alert, self._ROUTING_TREE)
         self.assertEqual(route["receiver"], "data-team")
         
         # Test default routing
         unmatched_alert = self.create_test_alert("info", team="unknown")
-        route = self.traverse_routing_tree(unmatched_alert, routing_tree)
+        route = self.traverse_routing_tree(unmatched_alert, self._ROUTING_TREE)
         self.assertEqual(route["receiver"], "default")
         
-        print("✓ Routing tree traversal tests passed")
+        logger.debug("✓ Routing tree traversal tests passed")
 
     def test_grouping_logic(self):
         """Test alert grouping functionality."""
-        print("Testing alert grouping logic...")
+        logger.debug("Testing alert grouping logic...")
         
         # Create multiple alerts with same grouping keys
         alerts = [
@@ -270,39 +703,63 @@ class AlertRoutingTest(unittest.TestCase):
         self.assertEqual(len(groups), 3)
         
         # Check specific groups
-        cpu_web_group = next(g for g in groups if 
-                           g["key"]["alertname"] == "HighCPUUsage" and 
-                           g["key"]["service"] == "web-server")
+        groups_by_key = {(g["key"]["alertname"], g["key"]["service"]): g for g in groups}
+        cpu_web_group = groups_by_key[("HighCPUUsage", "web-server")]
         self.assertEqual(len(cpu_web_group["alerts"]), 2)
         
-        memory_web_group = next(g for g in groups if 
-                              g["key"]["alertname"] == "HighMemoryUsage")
+        memory_web_group = groups_by_key[("HighMemoryUsage", "web-server")]
         self.assertEqual(len(memory_web_group["alerts"]), 1)
         
-        print("✓ Alert grouping logic tests passed")
+        logger.debug("✓ Alert grouping logic tests passed")
+
+    def test_grouping_logic_large_batch(self):
+        """Test alert grouping on batches large enough to vectorize."""
+        logger.debug("Testing alert grouping on a large batch...")
+        
+        alerts = []
+        for i in range(400):
+            alertname = "HighCPUUsage" if i % 2 else "HighMemoryUsage"
+            service = "web-server" if i % 4 < 2 else "api-server"
+            alerts.append(self.create_test_alert("critical", alertname=alertname, service=service))
+        
+        groups = self.group_alerts(alerts, ["alertname", "service"])
+        
+        self.assertEqual(len(groups), 4)
+        for group in groups:
+            self.assertEqual(len(group["alerts"]), 100)
+            for alert in group["alerts"]:
+                self.assertEqual(alert.labels["alertname"], group["key"]["alertname"])
+                self.assertEqual(alert.labels["service"], group["key"]["service"])
+        
+        logger.debug("✓ Large batch grouping tests passed")
 
     def create_test_alert(self, severity, alertname="TestAlert", team="test", service="test-service"):
         """Create a test alert with specified parameters."""
-        alert = {
-            "labels": {
-                "alertname": alertname,
-                "severity": severity,
-                "team": team,
-                "service": service,
-                "instance": "test-instance",
-                "job": "test-job"
-            },
-            "annotations": {
-                "summary": f"Test {severity} alert",
-                "description": f"This is a test {severity} alert for {service}"
-            },
-            "startsAt": datetime.utcnow().isoformat() + "Z",
-            "generatorURL": "http://prometheus:9090/graph"
+        alert = Alert()
+        alert.labels = {
+            _ALERTNAME: sys.intern(alertname),
+            _SEVERITY: sys.intern(severity),
+            _TEAM: sys.intern(team),
+            _SERVICE: sys.intern(service),
+            _INSTANCE: "test-instance",
+            _JOB: "test-job"
+        }
+        alert.annotations = {
+            "summary": f"Test {severity} alert",
+            "description": f"This is a test {severity} alert for {service}"
         }
+        alert.startsAt = self._now_iso
+        alert.generatorURL = "http://prometheus:9090/graph"
+        alert._fp = self._inhibition.register_labels(alert.labels)
         
         self.test_alerts.append(alert)
         return alert
 
+    def relabel_alert(self, alert, **labels):
+        """Update alert labels and refresh its fingerprint."""
+        alert.labels.update((sys.intern(k), sys.intern(v)) for k, v in labels.items())
+        alert._fp = self._inhibition.register_labels(alert.labels)
+
     def mock_route_matcher(self, alert, severity):
         """Mock route matching based on severity."""
         severity_routes = {
@@ -324,76 +781,80 @@ class AlertRoutingTest(unittest.TestCase):
 
     def check_inhibition(self, source_alert, target_alert, inhibition_rule):
         """Check if target alert should be inhibited by source alert."""
-        # Check source match
-        source_match = inhibition_rule["source_match"]
-        for key, value in source_match.items():
-            if source_alert["labels"].get(key) != value:
-                return False
-        
-        # Check target match
-        target_match = inhibition_rule["target_match"]
-        for key, value in target_match.items():
-            if target_alert["labels"].get(key) != value:
-                return False
-        
-        # Check equal fields
-        equal_fields = inhibition_rule.get("equal", [])
-        for field in equal_fields:
-            if source_alert["labels"].get(field) != target_alert["labels"].get(field):
-                return False
-        
-        return True
+        memo = self._inhibition
+        return memo.check(memo.alert_fp(source_alert), memo.alert_fp(target_alert),
+                          memo.rule_index(inhibition_rule))
+
+    def find_inhibited_alerts(self, source_alerts, target_alerts, inhibition_rule):
+        """Return the target alerts inhibited by any of the source alerts."""
+        index = _build_equals_index(source_alerts, inhibition_rule, self._inhibition)
+        prepared = _prepare_inhibition_rule(inhibition_rule)
+        target_match = prepared.tgt_items
+        equal_fields = prepared.equal
+        
+        inhibited = []
+        for target in target_alerts:
+            labels = target.labels
+            if not all(labels.get(key) == value for key, value in target_match):
+                continue
+            if _equal_key(labels, equal_fields) in index:
+                inhibited.append(target)
+        return inhibited
 
     def traverse_routing_tree(self, alert, routing_tree):
         """Traverse routing tree to find matching route."""
-        def match_route(route, alert):
-            match_criteria = route.get("match", {})
-            for key, value in match_criteria.items():
-                if alert["labels"].get(key) != value:
-                    return False
-            return True
-        
-        def find_route(route, alert):
-            # Check if current route matches
-            if match_route(route, alert):
-                # Check sub-routes
-                for sub_route in route.get("routes", []):
-                    result = find_route(sub_route, alert)
-                    if result:
-                        return result
-                return route
-            return None
-        
-        # Try to find matching route
-        for route in routing_tree.get("routes", []):
-            result = find_route(route, alert)
-            if result:
-                return result
-        
-        # Return default route
-        return {"receiver": routing_tree["receiver"]}
+        # Alerts with the same label set always resolve to the same route
+        cache_key = (id(routing_tree), self._inhibition.alert_fp(alert))
+        route = self._route_cache.get(cache_key)
+        if route is not None:
+            return route
+        
+        # Compile each tree once per test; the tree is kept alongside its
+        # compiled form so its id cannot be reused while cached.
+        cached = self._compiled_trees.get(id(routing_tree))
+        if cached is None:
+            cached = (routing_tree, _compile_routing_tree(routing_tree))
+            self._compiled_trees[id(routing_tree)] = cached
+        compiled = cached[1]
+        
+        # Try to find matching route, otherwise return default route
+        route = _traverse(compiled, alert.labels)
+        if route is None:
+            route = {"receiver": routing_tree["receiver"]}
+        
+        self._route_cache[cache_key] = route
+        return route
 
     def group_alerts(self, alerts, group_by):
         """Group alerts by specified keys."""
-        groups = {}
+        if _HAS_PANDAS and group_by and len(alerts) > _VECTORIZE_THRESHOLD:
+            return self.group_alerts_vectorized(alerts, group_by)
+        
+        groups = defaultdict(list)
         
         for alert in alerts:
-            # Create group key
-            key = {}
-            for field in group_by:
-                key[field] = alert["labels"].get(field, "")
-            
-            key_str = json.dumps(key, sort_keys=True)
-            
-            if key_str not in groups:
-                groups[key_str] = {
-                    "key": key,
-                    "alerts": []
-                }
-            
-            groups[key_str]["alerts"].append(alert)
+            labels = alert.labels
+            groups[tuple(labels.get(field, "") for field in group_by)].append(alert)
         
-        return list(groups.values())
+        return [{"key": dict(zip(group_by, key)), "alerts": group}
+                for key, group in groups.items()]
+
+    def group_alerts_vectorized(self, alerts, group_by):
+        """Group alerts by specified keys using pandas groupby."""
+        group_by = list(group_by)
+        df = pd.DataFrame([alert.labels for alert in alerts], columns=group_by).fillna("")
+        indices = df.groupby(group_by, sort=False).indices
+        
+        groups = []
+        # Keep first-seen group order, as the dict-based path does
+        for key, idx in sorted(indices.items(), key=lambda item: item[1][0]):
+            if not isinstance(key, tuple):
+                key = (key,)
+            groups.append({
+                "key": dict(zip(group_by, key)),
+                "alerts": [alerts[i] for i in idx]
+            })
+        return groups
 
     def silence_alert(self, alert):
         """Silence a test alert."""
@@ -403,26 +864,11 @@ class AlertRoutingTest(unittest.TestCase):
 
     def test_route_continue_behavior(self):
         """Test route continue behavior."""
-        print("Testing route continue behavior...")
-        
-        routing_config = {
-            "receiver": "default",
-            "routes": [
-                {
-                    "match": {"severity": "critical"},
-                    "receiver": "critical-alerts",
-                    "continue": True
-                },
-                {
-                    "match": {"team": "platform"},
-                    "receiver": "platform-team"
-                }
-            ]
-        }
+        logger.debug("Testing route continue behavior...")
         
         # Critical platform alert should match both routes
         alert = self.create_test_alert("critical", team="platform")
-        matched_routes = self.find_all_matching_routes(alert, routing_config)
+        matched_routes = self.find_all_matching_routes(alert, self._ROUTING_CONFIG)
         
         # Should match both critical and platform routes
         self.assertEqual(len(matched_routes), 2)
@@ -430,22 +876,15 @@ class AlertRoutingTest(unittest.TestCase):
         self.assertIn("critical-alerts", receivers)
         self.assertIn("platform-team", receivers)
         
-        print("✓ Route continue behavior tests passed")
+        logger.debug("✓ Route continue behavior tests passed")
 
     def find_all_matching_routes(self, alert, routing_config):
         """Find all matching routes including continue behavior."""
         matched_routes = []
+        labels = alert.labels
         
         for route in routing_config.get("routes", []):
-            match_criteria = route.get("match", {})
-            matches = True
-            
-            for key, value in match_criteria.items():
-                if alert["labels"].get(key) != value:
-                    matches = False
-                    break
-            
-            if matches:
+            if _route_matcher(route, self._route_matchers)(labels):
                 matched_routes.append(route)
                 # If continue is False or not specified, stop here
                 if not route.get("continue", False):
@@ -4,11 +4,13 @@ Trace Validation Test Suite for GoFiber Application
 Tests trace completeness, span relationships, timing, and annotations
 """
 
-import json
+import orjson
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pytest
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
@@ -17,6 +19,23 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Span duration warning thresholds in Jaeger's native microseconds
+_LONG_SPAN_US = 30_000_000  # 30s
+_SHORT_SPAN_US = 100        # 0.1ms
+
+# Tags every GoFiber span should carry
+_REQUIRED_COMPLETENESS_TAGS = ("http.method", "http.url", "component")
+_REQUIRED_COMPLETENESS_TAG_KEYS = frozenset(_REQUIRED_COMPLETENESS_TAGS)
+
+# Expected tags for GoFiber HTTP spans
+_EXPECTED_HTTP_TAGS = {
+    "http.method": "HTTP method",
+    "http.url": "Request URL",
+    "http.status_code": "HTTP status code",
+    "component": "Component name",
+    "span.kind": "Span kind"
+}
+
 @dataclass
 class TraceSpan:
     """Represents a trace span with all relevant metadata"""
@@ -38,6 +57,21 @@ class TraceValidator:
         self.jaeger_url = jaeger_url
         self.api_url = f"{jaeger_url}/api"
         
+        # Reuse pooled keep-alive connections across Jaeger calls and retry
+        # transient gateway errors
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=50,
+            max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # Fused result for the last indexed trace seen by the per-check
+        # validators: (spans, span_by_id, roots, results)
+        self._last_validation = None
+        
     def get_traces(self, service_name: str, lookback: str = "1h") -> List[Dict]:
         """Retrieve traces from Jaeger API"""
         try:
@@ -48,10 +82,10 @@ class TraceValidator:
                 "limit": 100
             }
             
-            response = requests.get(url, params=params, timeout=30)
+            response = self.session.get(url, params=params, timeout=30)
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             return data.get("data", [])
         except Exception as e:
             logger.error(f"Failed to retrieve traces: {e}")
@@ -74,201 +108,187 @@ class TraceValidator:
     
     def _parse_tags(self, tags: List[Dict]) -> Dict[str, Any]:
         """Parse tag list into dictionary"""
-        tag_dict = {}
-        for tag in tags:
-            key = tag.get("key", "")
-            value = tag.get("value", "")
-            tag_dict[key] = value
-        return tag_dict
+        return {tag.get("key", ""): tag.get("value", "") for tag in tags}
     
-    def validate_trace_completeness(self, trace: Dict) -> Dict[str, Any]:
-        """Validate that a trace has all required components"""
-        result = {
-            "valid": True,
-            "errors": [],
-            "warnings": []
-        }
+    def _index_trace(self, trace: Dict) -> Tuple[List[Dict], Dict[str, Dict], List[Dict]]:
+        """Index a trace's spans once so every validator can share the lookups
         
-        # Check if trace has spans
+        Returns (spans, span_by_id, roots).
+        """
         spans = trace.get("spans", [])
-        if not spans:
-            result["valid"] = False
-            result["errors"].append("Trace has no spans")
-            return result
-        
-        # Check for root span
-        root_spans = [s for s in spans if not s.get("parentSpanID")]
-        if not root_spans:
-            result["valid"] = False
-            result["errors"].append("No root span found")
-        elif len(root_spans) > 1:
-            result["warnings"].append(f"Multiple root spans found: {len(root_spans)}")
-        
-        # Check span completeness
-        for span in spans:
-            span_obj = self.parse_span(span)
-            if not span_obj.operation_name:
-                result["errors"].append(f"Span {span_obj.span_id} missing operation name")
-            
-            if span_obj.duration <= 0:
-                result["warnings"].append(f"Span {span_obj.span_id} has zero or negative duration")
-            
-            # Check for required GoFiber tags
-            required_tags = ["http.method", "http.url", "component"]
-            for tag in required_tags:
-                if tag not in span_obj.tags:
-                    result["warnings"].append(f"Span {span_obj.span_id} missing tag: {tag}")
-        
-        if result["errors"]:
-            result["valid"] = False
-        
-        return result
+        span_by_id = {s["spanID"]: s for s in spans}
+        roots = [s for s in spans if not s.get("parentSpanID")]
+        return spans, span_by_id, roots
     
-    def validate_span_relationships(self, trace: Dict) -> Dict[str, Any]:
-        """Validate parent-child relationships between spans"""
-        result = {
-            "valid": True,
-            "errors": [],
-            "warnings": []
-        }
+    def validate_trace(self, trace: Dict) -> Dict[str, Any]:
+        """Run every validation against a trace
         
-        spans = trace.get("spans", [])
-        span_map = {span["spanID"]: span for span in spans}
-        
-        for span in spans:
-            span_id = span["spanID"]
-            parent_id = span.get("parentSpanID")
-            
-            if parent_id:
-                # Check if parent exists
-                if parent_id not in span_map:
-                    result["valid"] = False
-                    result["errors"].append(f"Span {span_id} references non-existent parent {parent_id}")
-                else:
-                    parent_span = span_map[parent_id]
-                    
-                    # Check timing relationship
-                    if span["startTime"] < parent_span["startTime"]:
-                        result["errors"].append(f"Span {span_id} starts before parent {parent_id}")
-                    
-                    parent_end = parent_span["startTime"] + parent_span["duration"]
-                    span_end = span["startTime"] + span["duration"]
-                    
-                    if span_end > parent_end:
-                        result["warnings"].append(f"Span {span_id} ends after parent {parent_id}")
+        Returns the completeness, relationships, timing and tags results.
+        """
+        return self._validate_indexed(*self._index_trace(trace))
+    
+    def _validate_indexed(self, spans: List[Dict], span_by_id: Dict[str, Dict],
+                          roots: List[Dict]) -> Dict[str, Any]:
+        """Validate an indexed trace in a single pass over its spans"""
+        completeness = {"valid": True, "errors": [], "warnings": []}
+        relationships = {"valid": True, "errors": [], "warnings": []}
+        timing = {"valid": True, "errors": [], "warnings": [], "metrics": {}}
+        tags_result = {"valid": True, "errors": [], "warnings": [], "tag_coverage": {}}
         
-        if result["errors"]:
-            result["valid"] = False
+        tag_coverage = dict.fromkeys(_EXPECTED_HTTP_TAGS, 0)
+        tags_result["tag_coverage"] = tag_coverage
         
-        return result
-    
-    def validate_timing_and_duration(self, trace: Dict) -> Dict[str, Any]:
-        """Validate timing consistency and duration reasonableness"""
-        result = {
-            "valid": True,
-            "errors": [],
-            "warnings": [],
-            "metrics": {}
+        results = {
+            "completeness": completeness,
+            "relationships": relationships,
+            "timing": timing,
+            "tags": tags_result
         }
         
-        spans = trace.get("spans", [])
+        # Check if trace has spans
         if not spans:
-            return result
+            completeness["valid"] = False
+            completeness["errors"].append("Trace has no spans")
+            return results
         
-        # Calculate trace duration
-        start_times = [span["startTime"] for span in spans]
-        end_times = [span["startTime"] + span["duration"] for span in spans]
+        # Check for root span
+        if not roots:
+            completeness["valid"] = False
+            completeness["errors"].append("No root span found")
+        elif len(roots) > 1:
+            completeness["warnings"].append(f"Multiple root spans found: {len(roots)}")
         
-        trace_start = min(start_times)
-        trace_end = max(end_times)
-        trace_duration = trace_end - trace_start
+        trace_start = spans[0]["startTime"]
+        trace_end = trace_start + spans[0]["duration"]
         
-        result["metrics"] = {
-            "trace_duration_us": trace_duration,
-            "trace_duration_ms": trace_duration / 1000,
-            "span_count": len(spans),
-            "root_span_duration": max([s["duration"] for s in spans if not s.get("parentSpanID")], default=0)
-        }
-        
-        # Check for unreasonable durations
         for span in spans:
-            duration_ms = span["duration"] / 1000
+            span_id = span["spanID"]
+            operation_name = span.get("operationName", "")
+            start_time = span["startTime"]
+            duration = span["duration"]
+            end_time = start_time + duration
+            tags = self._parse_tags(span.get("tags", []))
             
-            # Check for very long durations (>30 seconds)
-            if duration_ms > 30000:
-                result["warnings"].append(f"Span {span['spanID']} has very long duration: {duration_ms}ms")
+            # Completeness: operation name, duration and required GoFiber tags
+            if not operation_name:
+                completeness["errors"].append(f"Span {span_id} missing operation name")
             
-            # Check for very short durations (<0.1ms)
-            if duration_ms < 0.1:
-                result["warnings"].append(f"Span {span['spanID']} has very short duration: {duration_ms}ms")
-        
-        # Check for time ordering
-        for span in spans:
+            if duration <= 0:
+                completeness["warnings"].append(f"Span {span_id} has zero or negative duration")
+            
+            if not _REQUIRED_COMPLETENESS_TAG_KEYS <= tags.keys():
+                for tag in _REQUIRED_COMPLETENESS_TAGS:
+                    if tag not in tags:
+                        completeness["warnings"].append(f"Span {span_id} missing tag: {tag}")
+            
+            # Relationships and ordering against the parent span
             parent_id = span.get("parentSpanID")
             if parent_id:
-                parent_spans = [s for s in spans if s["spanID"] == parent_id]
-                if parent_spans:
-                    parent = parent_spans[0]
-                    if span["startTime"] < parent["startTime"]:
-                        result["valid"] = False
-                        result["errors"].append(f"Span {span['spanID']} starts before parent")
-        
-        return result
-    
-    def validate_tags_and_annotations(self, trace: Dict) -> Dict[str, Any]:
-        """Validate tags and annotations for GoFiber specific requirements"""
-        result = {
-            "valid": True,
-            "errors": [],
-            "warnings": [],
-            "tag_coverage": {}
-        }
-        
-        spans = trace.get("spans", [])
-        
-        # Expected tags for GoFiber HTTP spans
-        expected_http_tags = {
-            "http.method": "HTTP method",
-            "http.url": "Request URL",
-            "http.status_code": "HTTP status code",
-            "component": "Component name",
-            "span.kind": "Span kind"
-        }
-        
-        tag_coverage = {tag: 0 for tag in expected_http_tags}
-        
-        for span in spans:
-            span_obj = self.parse_span(span)
+                parent_span = span_by_id.get(parent_id)
+                if parent_span is None:
+                    relationships["valid"] = False
+                    relationships["errors"].append(f"Span {span_id} references non-existent parent {parent_id}")
+                else:
+                    if start_time < parent_span["startTime"]:
+                        relationships["errors"].append(f"Span {span_id} starts before parent {parent_id}")
+                        timing["valid"] = False
+                        timing["errors"].append(f"Span {span_id} starts before parent")
+                    
+                    if end_time > parent_span["startTime"] + parent_span["duration"]:
+                        relationships["warnings"].append(f"Span {span_id} ends after parent {parent_id}")
+            
+            # Timing: trace bounds and duration reasonableness
+            if start_time < trace_start:
+                trace_start = start_time
+            if end_time > trace_end:
+                trace_end = end_time
             
-            # Check HTTP spans
-            if span_obj.tags.get("component") == "fiber" or "http" in span_obj.operation_name.lower():
-                for tag, description in expected_http_tags.items():
-                    if tag in span_obj.tags:
+            # Compare in integer microseconds; only convert to ms for a warning
+            if duration > _LONG_SPAN_US:
+                timing["warnings"].append(f"Span {span_id} has very long duration: {duration / 1000}ms")
+            elif duration < _SHORT_SPAN_US:
+                timing["warnings"].append(f"Span {span_id} has very short duration: {duration / 1000}ms")
+            
+            # Tags: check HTTP spans
+            if tags.get("component") == "fiber" or "http" in operation_name.lower():
+                for tag, description in _EXPECTED_HTTP_TAGS.items():
+                    if tag in tags:
                         tag_coverage[tag] += 1
                     else:
-                        result["warnings"].append(f"HTTP span {span_obj.span_id} missing {description}")
+                        tags_result["warnings"].append(f"HTTP span {span_id} missing {description}")
                 
                 # Validate HTTP status code
-                status_code = span_obj.tags.get("http.status_code")
+                status_code = tags.get("http.status_code")
                 if status_code:
                     try:
                         status_int = int(status_code)
                         if status_int >= 400:
                             # Check for error tag
-                            if not span_obj.tags.get("error"):
-                                result["warnings"].append(f"HTTP error span {span_obj.span_id} missing error tag")
+                            if not tags.get("error"):
+                                tags_result["warnings"].append(f"HTTP error span {span_id} missing error tag")
                     except ValueError:
-                        result["errors"].append(f"Invalid HTTP status code: {status_code}")
+                        tags_result["errors"].append(f"Invalid HTTP status code: {status_code}")
             
             # Check for error annotations
-            if span_obj.tags.get("error") == "true":
-                error_logs = [log for log in span_obj.logs if any(field.get("key") == "event" and "error" in field.get("value", "") for field in log.get("fields", []))]
-                if not error_logs:
-                    result["warnings"].append(f"Error span {span_obj.span_id} has no error logs")
+            if tags.get("error") == "true":
+                has_error_log = any(
+                    field.get("key") == "event" and "error" in field.get("value", "")
+                    for log in span.get("logs", ())
+                    for field in log.get("fields", ())
+                )
+                if not has_error_log:
+                    tags_result["warnings"].append(f"Error span {span_id} has no error logs")
         
-        result["tag_coverage"] = tag_coverage
+        if completeness["errors"]:
+            completeness["valid"] = False
+        if relationships["errors"]:
+            relationships["valid"] = False
         
-        return result
+        trace_duration = trace_end - trace_start
+        timing["metrics"] = {
+            "trace_duration_us": trace_duration,
+            "trace_duration_ms": trace_duration / 1000,
+            "span_count": len(spans),
+            "root_span_duration": max([s["duration"] for s in roots], default=0)
+        }
+        
+        return results
+    
+    def _validate_cached(self, spans: List[Dict], span_by_id: Dict[str, Dict],
+                         roots: List[Dict]) -> Dict[str, Any]:
+        """Run the fused pass once per indexed trace for the per-check validators
+        
+        Callers of the per-check API pass the same indexed trace to all four,
+        so the last result is reused when the very same objects come back;
+        holding them keeps their ids from being reused by another trace.
+        """
+        cached = self._last_validation
+        if (cached is not None and cached[0] is spans
+                and cached[1] is span_by_id and cached[2] is roots):
+            return cached[3]
+        results = self._validate_indexed(spans, span_by_id, roots)
+        self._last_validation = (spans, span_by_id, roots, results)
+        return results
+    
+    def validate_trace_completeness(self, spans: List[Dict], span_by_id: Dict[str, Dict],
+                                    roots: List[Dict]) -> Dict[str, Any]:
+        """Validate that a trace has all required components"""
+        return self._validate_cached(spans, span_by_id, roots)["completeness"]
+    
+    def validate_span_relationships(self, spans: List[Dict], span_by_id: Dict[str, Dict],
+                                    roots: List[Dict]) -> Dict[str, Any]:
+        """Validate parent-child relationships between spans"""
+        return self._validate_cached(spans, span_by_id, roots)["relationships"]
+    
+    def validate_timing_and_duration(self, spans: List[Dict], span_by_id: Dict[str, Dict],
+                                     roots: List[Dict]) -> Dict[str, Any]:
+        """Validate timing consistency and duration reasonableness"""
+        return self._validate_cached(spans, span_by_id, roots)["timing"]
+    
+    def validate_tags_and_annotations(self, spans: List[Dict], span_by_id: Dict[str, Dict],
+                                      roots: List[Dict]) -> Dict[str, Any]:
+        """Validate tags and annotations for GoFiber specific requirements"""
+        return self._validate_cached(spans, span_by_id, roots)["tags"]
 
 class TraceTestRunner:
     """Runs comprehensive trace validation tests"""
@@ -306,19 +326,16 @@ class TraceTestRunner:
             
             trace_result = {
                 "trace_id": trace.get("traceID", "unknown"),
-                "completeness": self.validator.validate_trace_completeness(trace),
-                "relationships": self.validator.validate_span_relationships(trace),
-                "timing": self.validator.validate_timing_and_duration(trace),
-                "tags": self.validator.validate_tags_and_annotations(trace)
+                **self.validator.validate_trace(trace)
             }
             
             # Calculate overall validity
-            all_valid = all([
-                trace_result["completeness"]["valid"],
-                trace_result["relationships"]["valid"],
-                trace_result["timing"]["valid"],
-                trace_result["tags"]["valid"]
-            ])
+            all_valid = (
+                trace_result["completeness"]["valid"]
+                and trace_result["relationships"]["valid"]
+                and trace_result["timing"]["valid"]
+                and trace_result["tags"]["valid"]
+            )
             
             trace_result["overall_valid"] = all_valid
             results["validation_results"].append(trace_result)
@@ -385,9 +402,70 @@ def test_gofiber_tags():
             assert coverage["http.status_code"] > 0, "HTTP spans should have status codes"
             assert coverage["component"] > 0, "HTTP spans should have component tags"
 
+def _synthetic_trace(filler_spans: int = 200) -> Dict:
+    """Build an offline trace that trips every timing and parent check
+
+    A root span is followed by one span per edge case (missing parent,
+    starts before parent, ends after parent, long and short durations), two
+    spans sharing the parent's start and end exactly, and then well-formed
+    filler children.
+    """
+    http_tags = [
+        {"key": "http.method", "value": "GET"},
+        {"key": "http.url", "value": "/api/orders"},
+        {"key": "http.status_code", "value": "200"},
+        {"key": "component", "value": "fiber"},
+        {"key": "span.kind", "value": "server"}
+    ]
+    base = 1_700_000_000_000_000
+
+    def span(span_id, parent_id, start_offset, duration):
+        return {
+            "traceID": "synthetic",
+            "spanID": span_id,
+            "parentSpanID": parent_id,
+            "operationName": f"GET /{span_id}",
+            "startTime": base + start_offset,
+            "duration": duration,
+            "tags": list(http_tags),
+            "logs": []
+        }
+
+    spans = [
+        span("root", None, 0, 60_000_000),
+        span("orphan", "missing", 1_000, 5_000),
+        span("early", "root", -500, 5_000),
+        span("late", "root", 59_999_000, 5_000),
+        span("long", "root", 0, 31_000_000),
+        span("short", "root", 2_000, 50),
+        span("aligned", "root", 0, 1_000),
+        span("flush", "root", 59_000_000, 1_000_000)
+    ]
+    spans += [span(f"child-{i}", "root", 10_000 + i * 100, 1_000 + i) for i in range(filler_spans)]
+    return {"traceID": "synthetic", "spans": spans}
+
+def test_timing_edge_cases():
+    """Test timing and parent checks against a synthetic trace (offline)"""
+    trace = _synthetic_trace()
+    results = TraceValidator().validate_trace(trace)
+    assert trace == _synthetic_trace(), "Validation must not modify the input spans"
+
+    # Every edge case in the synthetic trace must actually be reported
+    relationships, timing = results["relationships"], results["timing"]
+    assert "Span orphan references non-existent parent missing" in relationships["errors"]
+    assert "Span early starts before parent root" in relationships["errors"]
+    assert "Span early starts before parent" in timing["errors"]
+    assert "Span late ends after parent root" in relationships["warnings"]
+    assert "Span long has very long duration: 31000.0ms" in timing["warnings"]
+    assert "Span short has very short duration: 0.05ms" in timing["warnings"]
+    assert not any(message.startswith(("Span aligned", "Span flush"))
+                   for message in relationships["errors"] + relationships["warnings"])
+    assert not timing["valid"] and not relationships["valid"]
+    assert timing["metrics"]["trace_duration_us"] == 60_004_500
+
 if __name__ == "__main__":
     # Run validation when script is executed directly
     runner = TraceTestRunner()
     results = runner.run_validation_suite("apm-service")
     
-    print(json.dumps(results, indent=2))
\ No newline at end of file
+    print(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode())
\ No newline at end of file
@@ -4,34 +4,50 @@ Prometheus Metrics Validation Tests
 Validates Prometheus metrics collection, presence, and correctness.
 """
 
+import asyncio
+import collections
 import requests
 import time
-import json
+import orjson
+import re
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Any
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
 
 class PrometheusValidator:
     def __init__(self, prometheus_url: str = "http://localhost:9090"):
         self.prometheus_url = prometheus_url
         self.session = requests.Session()
         self.session.timeout = 30
+        # Instant query results fetched concurrently ahead of the sync checks
+        self._prefetched: Dict[str, Optional[Dict[str, Any]]] = {}
         
+    def _json(self, response) -> Any:
+        """Decode a requests or httpx response body with orjson"""
+        return orjson.loads(response.content)
+    
     def _query_prometheus(self, query: str) -> Optional[Dict[str, Any]]:
         """Execute Prometheus query and return results"""
+        if query in self._prefetched:
+            return self._prefetched[query]
         try:
             response = self.session.get(
                 f"{self.prometheus_url}/api/v1/query",
                 params={"query": query}
             )
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._json(response)
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
             print(f"Error querying Prometheus: {e}")
             return None
     
-    def _query_range(self, query: str, start: str, end: str, step: str = "1m") -> Optional[Dict[str, Any]]:
+    def _query_range(self, query: str, start: float, end: float, step: str = "1m") -> Optional[Dict[str, Any]]:
         """Execute Prometheus range query"""
         try:
             response = self.session.get(
@@ -44,11 +60,72 @@ class PrometheusValidator:
                 }
             )
             response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            return self._json(response)
+        except (requests.RequestException, orjson.JSONDecodeError) as e:
             print(f"Error querying Prometheus range: {e}")
             return None
     
+    async def _query_prometheus_async(self, client, query: str) -> Optional[Dict[str, Any]]:
+        """Execute Prometheus query over an async client and return results"""
+        try:
+            response = await client.get(
+                f"{self.prometheus_url}/api/v1/query",
+                params={"query": query}
+            )
+            response.raise_for_status()
+            return self._json(response)
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            print(f"Error querying Prometheus: {e}")
+            return None
+    
+    async def validate_metrics_batch(self, queries: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Execute instant queries concurrently, returning results in query order"""
+        # Plain HTTP/1.1: httpx has no cleartext HTTP/2 (h2c), so http2=True
+        # would gain nothing against an http:// Prometheus
+        async with httpx.AsyncClient(
+            timeout=30,
+            limits=httpx.Limits(max_connections=64)
+        ) as client:
+            return await asyncio.gather(*[self._query_prometheus_async(client, q) for q in queries])
+    
+    def prefetch(self, queries: List[str]):
+        """Run instant queries concurrently so later checks read cached results
+        
+        Replaces any previous prefetch. Failed queries are not cached, so the
+        checks retry them one at a time; without httpx, or if the batch
+        itself fails, every check queries Prometheus sequentially.
+        """
+        self._prefetched = {}
+        if httpx is None:
+            return
+        queries = list(dict.fromkeys(queries))
+        try:
+            results = asyncio.run(self.validate_metrics_batch(queries))
+        except Exception as e:
+            print(f"Prefetch failed, querying sequentially: {e}")
+            return
+        self._prefetched = {
+            query: result for query, result in zip(queries, results) if result is not None
+        }
+    
+    def clear_prefetch(self):
+        """Drop prefetched results so later checks query Prometheus directly"""
+        self._prefetched = {}
+    
+    def _presence_query(self, metric_name: str) -> str:
+        """Query used by validate_metric_presence"""
+        return f"count({metric_name})"
+    
+    def _presence_batch_query(self, metric_names: List[str]) -> str:
+        """Query used by validate_metric_presence_batch"""
+        pattern = "|".join(re.escape(name) for name in metric_names).replace("\\", "\\\\")
+        return f'count by(__name__)({{__name__=~"{pattern}"}})'
+    
+    def _labels_query(self, metric_name: str, required_labels: List[str]) -> str:
+        """Query used by validate_metric_labels"""
+        matchers = ",".join(f'{label}!=""' for label in required_labels)
+        return f"count({metric_name}{{{matchers}}})"
+    
     def check_prometheus_connectivity(self) -> bool:
         """Check if Prometheus is accessible"""
         try:
@@ -59,32 +136,39 @@ class PrometheusValidator:
     
     def validate_metric_presence(self, metric_name: str) -> bool:
         """Validate that a metric exists in Prometheus"""
-        result = self._query_prometheus(f"up{{job=\"{metric_name}\"}}")
+        result = self._query_prometheus(self._presence_query(metric_name))
         if not result or result.get("status") != "success":
             return False
         
-        data = result.get("data", {})
-        return len(data.get("result", [])) > 0
+        # count() yields no sample at all when the metric has no series
+        result_vec = result.get("data", {}).get("result", [])
+        return bool(result_vec) and float(result_vec[0]["value"][1]) > 0
     
-    def validate_metric_labels(self, metric_name: str, required_labels: List[str]) -> bool:
-        """Validate that metric has required labels"""
-        result = self._query_prometheus(f"{metric_name}")
+    def validate_metric_presence_batch(self, metric_names: List[str]) -> Dict[str, bool]:
+        """Validate that each metric has series, using a single Prometheus query"""
+        presence = dict.fromkeys(metric_names, False)
+        result = self._query_prometheus(self._presence_batch_query(metric_names))
         if not result or result.get("status") != "success":
-            return False
+            return presence
         
-        data = result.get("data", {})
-        results = data.get("result", [])
+        for result_item in result.get("data", {}).get("result", []):
+            name = result_item.get("metric", {}).get("__name__")
+            value = result_item.get("value", [])
+            if name in presence and len(value) >= 2:
+                presence[name] = float(value[1]) > 0
         
-        if not results:
+        return presence
+    
+    def validate_metric_labels(self, metric_name: str, required_labels: List[str]) -> bool:
+        """Validate that metric has required labels"""
+        # Prometheus only returns series carrying every required label, and
+        # count() collapses them into a single sample
+        result = self._query_prometheus(self._labels_query(metric_name, required_labels))
+        if not result or result.get("status") != "success":
             return False
         
-        # Check if all required labels are present in at least one result
-        for result_item in results:
-            metric_labels = result_item.get("metric", {})
-            if all(label in metric_labels for label in required_labels):
-                return True
-        
-        return False
+        result_vec = result.get("data", {}).get("result", [])
+        return bool(result_vec) and float(result_vec[0]["value"][1]) > 0
     
     def validate_metric_values(self, metric_name: str, min_value: float = None, max_value: float = None) -> bool:
         """Validate metric values are within expected range"""
@@ -116,13 +200,15 @@ class PrometheusValidator:
     
     def validate_time_series_data(self, metric_name: str, duration_minutes: int = 5) -> bool:
         """Validate time series data availability"""
-        end_time = datetime.now()
+        # Prometheus accepts Unix timestamps directly; an aware UTC window
+        # avoids local-time ambiguity (e.g. around DST changes)
+        end_time = datetime.now(timezone.utc)
         start_time = end_time - timedelta(minutes=duration_minutes)
         
         result = self._query_range(
             metric_name,
-            start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
-            end_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+            start_time.timestamp(),
+            end_time.timestamp()
         )
         
         if not result or result.get("status") != "success":
@@ -146,7 +232,12 @@ class PrometheusValidator:
 class MetricsValidationSuite:
     def __init__(self, prometheus_url: str = "http://localhost:9090"):
         self.validator = PrometheusValidator(prometheus_url)
-        self.test_results = []
+        # Running counters plus only the most recent failures, so memory stays
+        # bounded however many tests run
+        self.pass_count = 0
+        self.fail_count = 0
+        self.total_duration = 0.0
+        self.failures = collections.deque(maxlen=1000)
         
     def run_test(self, test_name: str, test_func, *args, **kwargs) -> bool:
         """Run a single test and record results"""
@@ -155,28 +246,76 @@ class MetricsValidationSuite:
             result = test_func(*args, **kwargs)
             end_time = time.time()
             
-            self.test_results.append({
-                "test_name": test_name,
-                "result": result,
-                "duration": end_time - start_time,
-                "timestamp": datetime.now().isoformat()
-            })
+            self.total_duration += end_time - start_time
+            if result:
+                self.pass_count += 1
+            else:
+                self.fail_count += 1
+                self.failures.append({
+                    "test_name": test_name,
+                    "result": result,
+                    "duration": end_time - start_time,
+                    "timestamp": datetime.fromtimestamp(end_time)
+                })
             
             status = "PASS" if result else "FAIL"
             print(f"[{status}] {test_name} ({end_time - start_time:.2f}s)")
             return result
             
         except Exception as e:
-            self.test_results.append({
+            self.fail_count += 1
+            self.failures.append({
                 "test_name": test_name,
                 "result": False,
                 "error": str(e),
                 "duration": 0,
-                "timestamp": datetime.now().isoformat()
+                "timestamp": datetime.now()
             })
             print(f"[ERROR] {test_name}: {e}")
             return False
     
+    def _presence_batch(self, category: str, metric_names: List[str]) -> Dict[str, bool]:
+        """Run a category's batched presence query with run_test's isolation
+        
+        The query time counts toward total_duration, and an error is recorded
+        as a failure and reported as every metric missing instead of aborting
+        the suite.
+        """
+        start_time = time.time()
+        try:
+            return self.validator.validate_metric_presence_batch(metric_names)
+        except Exception as e:
+            self.fail_count += 1
+            self.failures.append({
+                "test_name": f"{category} metric presence query",
+                "result": False,
+                "error": str(e),
+                "duration": time.time() - start_time,
+                "timestamp": datetime.now()
+            })
+            print(f"[ERROR] {category} metric presence query: {e}")
+            return dict.fromkeys(metric_names, False)
+        finally:
+            self.total_duration += time.time() - start_time
+    
+    def _prefetch_presence_and_labels(self, metrics: List[tuple]):
+        """Prefetch the batched presence query and the label queries for (metric, labels) pairs"""
+        queries = [self.validator._presence_batch_query([metric_name for metric_name, _ in metrics])]
+        for metric_name, required_labels in metrics:
+            if required_labels:
+                queries.append(self.validator._labels_query(metric_name, required_labels))
+        self._prefetch(queries)
+    
+    def _prefetch(self, queries: List[str]):
+        """Prefetch queries, counting the fetch toward total_duration
+        
+        The checks that later read these results report near-zero times, so
+        the concurrent fetch is where their Prometheus time is spent.
+        """
+        start_time = time.time()
+        self.validator.prefetch(queries)
+        self.total_duration += time.time() - start_time
+    
     def validate_core_metrics(self) -> bool:
         """Validate core Prometheus metrics"""
         core_metrics = [
@@ -187,11 +326,13 @@ class MetricsValidationSuite:
             "prometheus_rule_evaluation_duration_seconds"
         ]
         
+        presence = self._presence_batch("Core", core_metrics)
+        
         all_passed = True
         for metric in core_metrics:
             passed = self.run_test(
                 f"Core metric presence: {metric}",
-                self.validator.validate_metric_presence,
+                presence.get,
                 metric
             )
             all_passed = all_passed and passed
@@ -208,12 +349,15 @@ class MetricsValidationSuite:
             ("go_memstats_alloc_bytes", [])
         ]
         
+        self._prefetch_presence_and_labels(app_metrics)
+        presence = self._presence_batch("Application", [m for m, _ in app_metrics])
+        
         all_passed = True
         for metric_name, required_labels in app_metrics:
             # Test metric presence
             passed = self.run_test(
                 f"Application metric presence: {metric_name}",
-                self.validator.validate_metric_presence,
+                presence.get,
                 metric_name
             )
             all_passed = all_passed and passed
@@ -240,11 +384,14 @@ class MetricsValidationSuite:
             ("node_network_receive_bytes_total", ["device"])
         ]
         
+        self._prefetch_presence_and_labels(infra_metrics)
+        presence = self._presence_batch("Infrastructure", [m for m, _ in infra_metrics])
+        
         all_passed = True
         for metric_name, required_labels in infra_metrics:
             passed = self.run_test(
                 f"Infrastructure metric presence: {metric_name}",
-                self.validator.validate_metric_presence,
+                presence.get,
                 metric_name
             )
             all_passed = all_passed and passed
@@ -269,6 +416,8 @@ class MetricsValidationSuite:
             ("http_request_duration_seconds", 0.0, 60.0)
         ]
         
+        self._prefetch([metric_name for metric_name, _, _ in value_tests])
+        
         all_passed = True
         for metric_name, min_val, max_val in value_tests:
             passed = self.run_test(
@@ -324,7 +473,11 @@ class MetricsValidationSuite:
         overall_result = True
         for category, validation_func in validations:
             print(f"\n--- {category} ---")
-            result = validation_func()
+            try:
+                result = validation_func()
+            finally:
+                # Prefetched results only hold for the category that fetched them
+                self.validator.clear_prefetch()
             overall_result = overall_result and result
         
         self.print_summary()
@@ -336,9 +489,9 @@ class MetricsValidationSuite:
         print("VALIDATION SUMMARY")
         print("=" * 50)
         
-        total_tests = len(self.test_results)
-        passed_tests = sum(1 for result in self.test_results if result["result"])
-        failed_tests = total_tests - passed_tests
+        passed_tests = self.pass_count
+        failed_tests = self.fail_count
+        total_tests = passed_tests + failed_tests
         
         print(f"Total Tests: {total_tests}")
         print(f"Passed: {passed_tests}")
@@ -346,24 +499,29 @@ class MetricsValidationSuite:
         print(f"Success Rate: {(passed_tests/total_tests)*100:.1f}%")
         
         if failed_tests > 0:
-            print("\nFailed Tests:")
-            for result in self.test_results:
-                if not result["result"]:
-                    error_msg = result.get("error", "Test failed")
-                    print(f"  - {result['test_name']}: {error_msg}")
+            if failed_tests > len(self.failures):
+                print(f"\nFailed Tests (most recent {len(self.failures)}):")
+            else:
+                print("\nFailed Tests:")
+            for result in self.failures:
+                error_msg = result.get("error", "Test failed")
+                print(f"  - {result['test_name']}: {error_msg}")
     
     def save_results(self, filename: str = "metrics_validation_results.json"):
         """Save test results to JSON file"""
-        with open(filename, 'w') as f:
-            json.dump({
+        # orjson serializes the datetime timestamps natively (ISO 8601)
+        with open(filename, 'wb') as f:
+            f.write(orjson.dumps({
                 "validation_run": {
-                    "timestamp": datetime.now().isoformat(),
-                    "total_tests": len(self.test_results),
-                    "passed": sum(1 for r in self.test_results if r["result"]),
-                    "failed": sum(1 for r in self.test_results if not r["result"])
+                    "timestamp": datetime.now(),
+                    "total_tests": self.pass_count + self.fail_count,
+                    "passed": self.pass_count,
+                    "failed": self.fail_count,
+                    "total_duration": self.total_duration
                 },
-                "test_results": self.test_results
-            }, f, indent=2)
+                # Failed tests only, most recent last
+                "test_results": list(self.failures)
+            }, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
 
 def main():